@@ -3,14 +3,23 @@ import re
 import json
 import logging
 import requests
-import copy
+from requests.adapters import HTTPAdapter
+import uuid
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from flask import Flask, render_template, request, jsonify, session
+from flask.json.provider import DefaultJSONProvider
 from config import get_config
 from data_adapter import DataServiceFactory
 from scheduler_strategies import DeepSeekSchedulerStrategy
 from scheduler_core import ScheduleConstraints
 from prerequisite_parser import PrerequisiteParser
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -34,13 +43,20 @@ if found_data_path:
     Config.DATA_FILE_PATH = found_data_path
     logger.info(f"Data file found at: {found_data_path}")
 
+# Load course data in the background so the first request finds it warm
+DataServiceFactory.warm_up()
+
 # Load Major/Minor Requirements
 catalog_db = {}
 major_path = os.path.join(base_dir, majors_filename)
 if os.path.exists(major_path):
     try:
-        with open(major_path, 'r', encoding='utf-8') as f:
-            catalog_db = json.load(f)
+        if orjson:
+            with open(major_path, 'rb') as f:
+                catalog_db = orjson.loads(f.read())
+        else:
+            with open(major_path, 'r', encoding='utf-8') as f:
+                catalog_db = json.load(f)
         if "majors" not in catalog_db:
             catalog_db = {"majors": catalog_db, "minors": {}, "certificates": {}}
         m = len(catalog_db.get('majors', {}))
@@ -52,15 +68,60 @@ if os.path.exists(major_path):
 else:
     logger.warning("⚠️ major_requirements.json NOT FOUND. Run pdf_scraper.py first.")
 
+# The catalog never changes at runtime, so each program's prompt snippet is rendered once
+catalog_prompts = [
+    (name.lower(), f"{category[:-1].capitalize()} in {name} ({details.get('school','?')}) Reqs: {json.dumps(details)}. ")
+    for category in ["majors", "minors", "certificates"]
+    for name, details in catalog_db.get(category, {}).items()
+]
+
+# Programs indexed by the first few characters of their name so a message is scanned in one pass
+CATALOG_PREFIX_LEN = 3
+catalog_prefix_index = {}
+catalog_short_names = []
+for i, (name, _) in enumerate(catalog_prompts):
+    if len(name) < CATALOG_PREFIX_LEN:
+        catalog_short_names.append(i)
+    else:
+        catalog_prefix_index.setdefault(name[:CATALOG_PREFIX_LEN], []).append(i)
+
+def match_catalog_prompts(lower_input):
+    """Returns the prompt snippets of every program named in the message, in catalog order."""
+    matched = {i for i in catalog_short_names if catalog_prompts[i][0] in lower_input}
+    for pos in range(len(lower_input) - CATALOG_PREFIX_LEN + 1):
+        for i in catalog_prefix_index.get(lower_input[pos:pos + CATALOG_PREFIX_LEN], ()):
+            if lower_input.startswith(catalog_prompts[i][0], pos):
+                matched.add(i)
+    return "".join(catalog_prompts[i][1] for i in sorted(matched))
+
 app = Flask(__name__, template_folder=template_dir, static_folder=static_dir)
 app.config.from_object(Config)
 app.secret_key = 'dev_key_for_session'
 
-GREETINGS = ["hello", "hi", "hey", "greetings", "sup"]
+class OrjsonProvider(DefaultJSONProvider):
+    """Serializes responses with orjson, which is several times faster on large schedule payloads."""
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_INDENT_2 if kwargs.get('indent') else 0
+        if self.sort_keys: option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+if orjson:
+    app.json = OrjsonProvider(app)
+
+GREETINGS = ("hello", "hi", "hey", "greetings", "sup")
+NO_DAY_TOKENS = (("fri", "F"), ("mon", "M"), ("tue", "T"), ("wed", "W"), ("thu", "TH"))
+LOCAL_CODE_RE = re.compile(r'(\d{3})[:\s\-](\d{3})')
+GREETING_RE = re.compile(r'\b(?:' + '|'.join(GREETINGS) + r')\b')
 
 # --- GENERATIVE AI ENGINE ---
 
 class GeminiAgent:
+    MODEL_BATCH_SIZE = 2 # Models probed concurrently before falling back to the next batch
+    REQUEST_TIMEOUT_SECONDS = 30
+
     def __init__(self, api_keys):
         self.api_keys = api_keys if isinstance(api_keys, list) else [api_keys]
         self.current_key_index = 0
@@ -73,6 +134,10 @@ class GeminiAgent:
             "gemini-1.5-flash-latest",
             "gemini-pro"
         ]
+        self._executor = ThreadPoolExecutor(max_workers=self.MODEL_BATCH_SIZE * 4)
+        # Keep-alive session so repeated calls reuse the TLS connection to Google
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=self.MODEL_BATCH_SIZE * 4))
         self._discover_and_log_models()
 
     def _get_current_key(self):
@@ -92,7 +157,7 @@ class GeminiAgent:
         if not key or "YOUR_KEY" in key: return
         try:
             url = f"{self.base_url}?key={key}"
-            response = requests.get(url)
+            response = self._session.get(url, timeout=self.REQUEST_TIMEOUT_SECONDS)
             if response.status_code == 200:
                 data = response.json()
                 models = [m['name'].replace('models/', '') for m in data.get('models', []) if 'generateContent' in m.get('supportedGenerationMethods', [])]
@@ -102,6 +167,31 @@ class GeminiAgent:
         except Exception as e:
             logger.error(f"Model discovery error: {e}")
 
+    def _try_model(self, model, key, payload):
+        """Returns the generated text, or None if this model can't serve the request right now."""
+        headers = {'Content-Type': 'application/json'}
+        url = f"{self.base_url}/{model}:generateContent?key={key}"
+        try:
+            response = self._session.post(url, headers=headers, json=payload, timeout=self.REQUEST_TIMEOUT_SECONDS)
+            
+            # Success
+            if response.status_code == 200:
+                data = response.json()
+                if 'candidates' in data and data['candidates']:
+                    logger.info(f"✅ Success with model: {model} (Key #{self.current_key_index + 1})")
+                    return data['candidates'][0]['content']['parts'][0]['text']
+            
+            # Handle Rate Limit (429) -> Try next model, or rotate key if all models fail
+            elif response.status_code == 429:
+                logger.warning(f"⚠️ Rate Limit (429) on {model}. Trying next model...")
+            
+            elif response.status_code != 404:
+                logger.warning(f"❌ Error {response.status_code} on {model}: {response.text[:100]}...")
+        
+        except Exception as e:
+            logger.error(f"Connection error on {model}: {e}")
+        return None
+
     def _generate(self, prompt_text):
         attempts = 0
         max_attempts = len(self.api_keys) # Try each key once per generation request
@@ -111,35 +201,17 @@ class GeminiAgent:
             if not current_key or "YOUR_KEY" in current_key:
                 return None
             
-            headers = {'Content-Type': 'application/json'}
             payload = {"contents": [{"parts": [{"text": prompt_text}]}]}
             
-            # Iterate through preferred models until one works
-            for model in self.preferred_models:
-                url = f"{self.base_url}/{model}:generateContent?key={current_key}"
-                try:
-                    response = requests.post(url, headers=headers, json=payload)
-                    
-                    # Success
-                    if response.status_code == 200:
-                        data = response.json()
-                        if 'candidates' in data and data['candidates']:
-                            logger.info(f"✅ Success with model: {model} (Key #{self.current_key_index + 1})")
-                            return data['candidates'][0]['content']['parts'][0]['text']
-                    
-                    # Handle Rate Limit (429) -> Try next model, or rotate key if all models fail
-                    elif response.status_code == 429:
-                        logger.warning(f"⚠️ Rate Limit (429) on {model}. Trying next model...")
-                        continue 
-                    
-                    elif response.status_code == 404:
-                        continue
-
-                    else:
-                        logger.warning(f"❌ Error {response.status_code} on {model}: {response.text[:100]}...")
-                
-                except Exception as e:
-                    logger.error(f"Connection error on {model}: {e}")
+            # Probe preferred models a batch at a time; the first success wins and the rest are dropped
+            for i in range(0, len(self.preferred_models), self.MODEL_BATCH_SIZE):
+                batch = self.preferred_models[i:i + self.MODEL_BATCH_SIZE]
+                futures = [self._executor.submit(self._try_model, model, current_key, payload) for model in batch]
+                for future in as_completed(futures):
+                    text = future.result()
+                    if text:
+                        for f in futures: f.cancel()
+                        return text
             
             # If we exit the model loop, it means the current key failed for all models (likely rate limit or quota)
             logger.warning(f"⚠️ Key #{self.current_key_index + 1} exhausted/failed. Rotating...")
@@ -151,6 +223,13 @@ class GeminiAgent:
         return None
 
     def analyze_intent(self, user_text, history_context="", major_context=""):
+        try:
+            return self._analyze_intent_cached(user_text, history_context, major_context)
+        except: return None
+
+    @lru_cache(maxsize=256)
+    def _analyze_intent_cached(self, user_text, history_context, major_context):
+        """Raises instead of returning None so lru_cache only keeps successful analyses."""
         prompt = f"""
         You are an expert Rutgers academic advisor.
         
@@ -177,11 +256,9 @@ class GeminiAgent:
         }}
         """
         raw_text = self._generate(prompt)
-        if not raw_text: return None
-        try:
-            text = raw_text.replace("```json", "").replace("```", "").strip()
-            return json.loads(text)
-        except: return None
+        if not raw_text: raise ValueError("No response from Gemini")
+        text = raw_text.replace("```json", "").replace("```", "").strip()
+        return json.loads(text)
 
     def chat_fallback(self, user_text):
         return self._generate(f"You are a helpful Rutgers scheduler. Reply to: {user_text}") or "I'm having trouble thinking right now."
@@ -205,7 +282,45 @@ class GeminiAgent:
         """
         return self._generate(prompt)
 
-ai_agent = GeminiAgent(Config.GEMINI_API_KEYS)
+if not Config.gemini_api_keys():
+    logger.warning("No GEMINI_API_KEY_1/GEMINI_API_KEY_2 set; AI features are disabled.")
+ai_agent = GeminiAgent(Config.gemini_api_keys())
+
+# Advisor notes are generated off the request path and fetched by the client afterwards
+ADVICE_TIMEOUT_SECONDS = 30
+MAX_PENDING_ADVICE = 100
+advice_executor = ThreadPoolExecutor(max_workers=4)
+pending_advice = {}
+
+def submit_advice(fn, *args):
+    """Starts an LLM call in the background and returns the id the client polls with."""
+    while len(pending_advice) >= MAX_PENDING_ADVICE:
+        pending_advice.pop(next(iter(pending_advice)), None)
+    advice_id = uuid.uuid4().hex
+    pending_advice[advice_id] = advice_executor.submit(fn, *args)
+    return advice_id
+
+def format_schedule_for_frontend(schedules, courses):
+    """
+    Converts scheduler output into the rows the client renders. The same section
+    shows up in many schedules, so each one is looked up and formatted once per call.
+    """
+    formatted = {}
+    section_to_course = {s.index: (c.title, c.code) for c in courses for s in c.sections}
+
+    def format_section(section):
+        course_title, course_code_str = section_to_course.get(section.index, ("Unknown Course", "000:000"))
+        row = formatted[section.index] = {
+            'course': course_code_str,
+            'title': course_title,
+            'index': section.index,
+            'instructors': section.instructors,
+            'times': [str(t) for t in section.time_slots]
+        }
+        return row
+
+    get_row = formatted.get # Bound once; this runs for every section of every schedule
+    return [[get_row(section.index) or format_section(section) for section in schedule] for schedule in schedules]
 
 # --- ROUTES ---
 
@@ -228,7 +343,9 @@ def parse_history():
                 lookup_map[f"{s}:{n}"] = c.get('title', '')
         for c in taken_courses:
             c['title'] = lookup_map.get(c['short_code'], 'Unknown Title')
-        session['course_history'] = taken_courses
+        # Only touch the session when the history changed so Flask doesn't re-sign the cookie
+        if session.get('course_history') != taken_courses:
+            session['course_history'] = taken_courses
         return jsonify({'message': f"Imported {len(taken_courses)} courses.", 'courses': taken_courses})
     except Exception as e:
         logger.error(f"Parse Error: {e}")
@@ -244,27 +361,22 @@ def chat_endpoint():
         logger.info(f"User Query: {text_input}")
         
         history = session.get('course_history', [])
-        history_codes = [h['short_code'] for h in history] if history else []
-        history_str = ", ".join(history_codes)
+        history_codes = {h['short_code'] for h in history}
+        history_str = ", ".join(h['short_code'] for h in history)
 
-        full_major_context = ""
         lower_input = text_input.lower()
-        for category in ["majors", "minors", "certificates"]:
-            cat_data = catalog_db.get(category, {})
-            for name, details in cat_data.items():
-                if name.lower() in lower_input:
-                    full_major_context += f"{category[:-1].capitalize()} in {name} ({details.get('school','?')}) Reqs: {json.dumps(details)}. "
+        full_major_context = match_catalog_prompts(lower_input)
 
         ai_result = ai_agent.analyze_intent(text_input, history_context=history_str, major_context=full_major_context)
         logger.info(f"AI Analysis: {ai_result}")
         
         if not ai_result:
-            local_codes = re.findall(r'(\d{3})[:\s\-](\d{3})', text_input)
+            local_codes = LOCAL_CODE_RE.findall(text_input)
             ai_result = {
                 "codes": [f"{m[0]}:{m[1]}" for m in local_codes],
                 "subjects": [],
                 "constraints": [],
-                "is_conversational": any(g in lower_input for g in GREETINGS),
+                "is_conversational": GREETING_RE.search(lower_input) is not None,
                 "explanation": ""
             }
 
@@ -279,35 +391,35 @@ def chat_endpoint():
         final_codes = PrerequisiteParser.filter_completed_courses(final_codes, history)
         
         raw_constraints = ai_result.get("constraints", [])
-        local_no_days = []
-        for c in raw_constraints:
-            c = c.lower()
-            if "fri" in c: local_no_days.append("F")
-            if "mon" in c: local_no_days.append("M")
-            if "tue" in c: local_no_days.append("T")
-            if "wed" in c: local_no_days.append("W")
-            if "thu" in c: local_no_days.append("TH")
+        lowered_constraints = [c.lower() for c in raw_constraints]
+        local_no_days = {day for c in lowered_constraints for token, day in NO_DAY_TOKENS if token in c}
         
         # --- MULTI-PASS SCHEDULING STRATEGY ---
         
         repo = DataServiceFactory.get_repository()
         
         # Subject Resolution
+        seen_codes = set(final_codes)
         if subjects and len(final_codes) < 4: # Only auto-fill if we have few courses
             for subj in subjects:
-                if "sas core" in subj.lower():
-                    found = repo.search_courses("Core") 
-                    if not found: found = repo.search_courses("Psychology")
-                else:
-                    found = repo.search_courses(subj)
+                # Open courses are indexed at load; freshmen only get prereq-free ones
+                candidates = repo.get_open_course_codes(subj, freshman_safe=not history)
+                if not candidates:
+                    if "sas core" in subj.lower():
+                        found = repo.search_courses("Core") 
+                        if not found: found = repo.search_courses("Psychology")
+                    else:
+                        found = repo.search_courses(subj)
+                    candidates = sorted((c.code for c in found), key=lambda code: code.split(':')[1])
                 
-                valid = [c for c in found if c.code not in history_codes]
-                valid.sort(key=lambda x: x.code.split(':')[1])
+                valid = [code for code in candidates if code not in history_codes]
                 
-                for c in valid[:3]: 
-                    if c.code not in final_codes: final_codes.append(c.code)
+                for code in valid[:3]: 
+                    if code not in seen_codes:
+                        seen_codes.add(code)
+                        final_codes.append(code)
         
-        final_codes = list(set(final_codes))
+        final_codes = list(dict.fromkeys(final_codes)) # Order-stable dedup keeps runs deterministic
         if not final_codes:
             msg = f"I couldn't find new courses. {explanation}"
             if history: msg += " (Checked against history)."
@@ -316,41 +428,27 @@ def chat_endpoint():
         courses_obj = repo.get_courses(final_codes)
         found_real_codes = [c.code for c in courses_obj]
         
+        # A course with no open section can never be placed; say so instead of searching and asking the LLM why
+        closed_codes = [c.code for c in courses_obj if not c.open_sections]
+        if closed_codes:
+            return jsonify({'message': f"There are no open sections left for {', '.join(closed_codes)}. Remove them and try again.", 'schedules': []})
+
         scheduler = DeepSeekSchedulerStrategy()
         
         # PASS 1: Strict Constraints
-        constraints = ScheduleConstraints(no_days=list(set(local_no_days)))
+        constraints = ScheduleConstraints(no_days=list(local_no_days))
         results = []
         valid_schedules = scheduler.generate_schedules(courses_obj, constraints)
         
         status_msg = ""
+        advice_id = None
         
         if valid_schedules:
             # Success on Pass 1
-            for schedule in valid_schedules:
-                schedule_data = []
-                for section in schedule:
-                    course_title = "Unknown Course"
-                    course_code_str = "000:000"
-                    
-                    for c in courses_obj:
-                        for s in c.sections:
-                            if s.index == section.index:
-                                course_title = c.title
-                                course_code_str = c.code
-                                break
-                    
-                    schedule_data.append({
-                        'course': course_code_str,
-                        'title': course_title,
-                        'index': section.index,
-                        'instructors': section.instructors,
-                        'times': [str(t) for t in section.time_slots]
-                    })
-                results.append(schedule_data)
+            results = format_schedule_for_frontend(valid_schedules, courses_obj)
                 
-            ai_success_msg = ai_agent.summarize_success(found_real_codes, raw_constraints, len(results))
-            status_msg = ai_success_msg if ai_success_msg else f"Success! Found {len(results)} options."
+            advice_id = submit_advice(ai_agent.summarize_success, found_real_codes, raw_constraints, len(results))
+            status_msg = f"Success! Found {len(results)} options."
             
         else:
             # Failure on Pass 1 -> Try PASS 2 (Relaxed Constraints)
@@ -360,40 +458,32 @@ def chat_endpoint():
                 valid_schedules_relaxed = scheduler.generate_schedules(courses_obj, relaxed_constraints)
                 
                 if valid_schedules_relaxed:
-                    for schedule in valid_schedules_relaxed:
-                        schedule_data = []
-                        for section in schedule:
-                            course_title = "Unknown Course"
-                            course_code_str = "000:000"
-                            for c in courses_obj:
-                                for s in c.sections:
-                                    if s.index == section.index:
-                                        course_title = c.title
-                                        course_code_str = c.code
-                                        break
-
-                            schedule_data.append({
-                                'course': course_code_str,
-                                'title': course_title,
-                                'index': section.index,
-                                'instructors': section.instructors,
-                                'times': [str(t) for t in section.time_slots]
-                            })
-                        results.append(schedule_data)
+                    results = format_schedule_for_frontend(valid_schedules_relaxed, courses_obj)
                     
                     status_msg = f"I couldn't find a schedule with your constraints ({', '.join(raw_constraints)}), BUT I found {len(results)} options if you are flexible."
                 else:
-                    advice = ai_agent.explain_failure(found_real_codes, raw_constraints)
-                    status_msg = f"I couldn't find any valid schedule even after relaxing constraints. {advice}"
+                    advice_id = submit_advice(ai_agent.explain_failure, found_real_codes, raw_constraints)
+                    status_msg = "I couldn't find any valid schedule even after relaxing constraints."
             else:
-                advice = ai_agent.explain_failure(found_real_codes, raw_constraints)
-                status_msg = f"I couldn't find a valid combination for {', '.join(found_real_codes)}. {advice}"
+                advice_id = submit_advice(ai_agent.explain_failure, found_real_codes, raw_constraints)
+                status_msg = f"I couldn't find a valid combination for {', '.join(found_real_codes)}."
 
-        return jsonify({"message": status_msg, "schedules": results, "count": len(results)})
+        return jsonify({"message": status_msg, "schedules": results, "count": len(results), "advice_id": advice_id})
 
     except Exception as e:
         logger.error(f"Chat Error: {e}", exc_info=True)
         return jsonify({'message': 'System Error.', 'error': str(e)}), 500
 
+@app.route('/api/advice/<advice_id>', methods=['GET'])
+def advice_endpoint(advice_id):
+    future = pending_advice.pop(advice_id, None)
+    if future is None:
+        return jsonify({'message': ''}), 404
+    try:
+        return jsonify({'message': future.result(timeout=ADVICE_TIMEOUT_SECONDS) or ''})
+    except Exception as e:
+        logger.error(f"Advice Error: {e}")
+        return jsonify({'message': ''})
+
 if __name__ == '__main__':
     app.run(debug=Config.DEBUG)
\ No newline at end of file
@@ -1,20 +1,60 @@
 import json
 import os
 import re
+import time
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import List, Dict, Set
 from scheduler_core import ICourseRepository, Course, Section
 from config import get_config
 import logging
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 Config = get_config()
 
+# Course codes like "01:198:111" or "198:111" inside catalog notes
+PREREQ_CODE_RE = re.compile(r'(?:(\d{2}):)?(\d{3}):(\d{3})')
+
 class RutgersAPIClient:
     BASE_URL = "http://sis.rutgers.edu/soc/api/courses.json"
+    TIMEOUT_SECONDS = 60
+    # Rate limits and transient 5xx are retried with exponential backoff (1s, 2s, 4s, ...), honoring Retry-After
+    RETRY_POLICY = Retry(
+        total=5,
+        backoff_factor=1,
+        status_forcelist=(429, 500, 502, 503, 504),
+        respect_retry_after_header=True,
+        allowed_methods=["GET"]
+    )
+    _session = None
+    _session_lock = threading.Lock()
+
+    @classmethod
+    def _get_session(cls) -> requests.Session:
+        """Returns one keep-alive session shared by every refresh, so the SIS connection is reused."""
+        with cls._session_lock:
+            if cls._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(max_retries=cls.RETRY_POLICY)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                cls._session = session
+            return cls._session
 
     @staticmethod
-    def fetch_schedule(semester_code: str, campus: str, level: str) -> List[Dict]:
+    def fetch_schedule(semester_code: str, campus: str, level: str, validators: Dict[str, str] = None) -> List[Dict]:
+        """
+        Fetches the course list. When a validators dict is passed, the request is
+        made conditional on its ETag/Last-Modified and the dict is updated from the
+        response; an unchanged (304) catalog returns [] like any other no-data result.
+        """
         if len(semester_code) >= 5:
             term = semester_code[0]
             year = semester_code[1:]
@@ -31,9 +71,20 @@ class RutgersAPIClient:
 
         logger.info(f"Fetching live data from Rutgers API: {params}")
         try:
-            response = requests.get(RutgersAPIClient.BASE_URL, params=params)
+            session = RutgersAPIClient._get_session()
+            headers = {}
+            if validators:
+                if validators.get('etag'): headers['If-None-Match'] = validators['etag']
+                if validators.get('last_modified'): headers['If-Modified-Since'] = validators['last_modified']
+            response = session.get(RutgersAPIClient.BASE_URL, params=params, headers=headers, timeout=RutgersAPIClient.TIMEOUT_SECONDS)
+            if response.status_code == 304:
+                logger.info("Rutgers API data unchanged since last fetch.")
+                return []
             response.raise_for_status()
-            data = response.json()
+            if validators is not None:
+                validators['etag'] = response.headers.get('ETag')
+                validators['last_modified'] = response.headers.get('Last-Modified')
+            data = orjson.loads(response.content) if orjson else response.json()
             logger.info(f"Successfully fetched {len(data)} courses.")
             return data
         except Exception as e:
@@ -43,39 +94,117 @@ class RutgersAPIClient:
 class JsonFileAdapter(ICourseRepository):
     def __init__(self, file_path: str = None):
         self.file_path = file_path or Config.DATA_FILE_PATH
+        self._validators: Dict[str, str] = {} # ETag/Last-Modified of the last live fetch
         self.data_cache = self._initialize_data()
+        self._build_indexes()
 
     def _initialize_data(self) -> List[Dict]:
         if os.path.exists(self.file_path):
             try:
                 logger.info(f"Loading cached data from {self.file_path}")
-                with open(self.file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if data: return data
+                if orjson:
+                    with open(self.file_path, 'rb') as f:
+                        data = orjson.loads(f.read())
+                else:
+                    with open(self.file_path, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                if data: return data
             except json.JSONDecodeError:
                 logger.warning("Local data file is corrupt. Re-fetching...")
 
         logger.info("Local cache missing or invalid. Triggering self-healing fetch...")
         return self.force_update()
 
-    def force_update(self) -> List[Dict]:
+    def force_update(self, validators: Dict[str, str] = None) -> List[Dict]:
         data = RutgersAPIClient.fetch_schedule(
             Config.SEMESTER_CODE,
             Config.CAMPUS_CODE,
-            Config.LEVEL_CODE
+            Config.LEVEL_CODE,
+            validators
         )
 
         if data:
             try:
                 os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
-                with open(self.file_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f)
+                # Renamed into place so a crash or a concurrent startup never reads a half-written cache
+                payload = orjson.dumps(data) if orjson else json.dumps(data).encode('utf-8')
+                tmp_path = self.file_path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(payload)
+                os.replace(tmp_path, self.file_path)
                 logger.info(f"Saved fresh data to {self.file_path}")
             except Exception as e:
                 logger.error(f"Could not save data to file: {e}")
         
         return data
 
+    def _build_indexes(self) -> None:
+        """
+        Groups the catalog by subject and buckets every course with an open section by subject and by core code.
+        Lists are presorted by course number so lookups need no re-filtering.
+        Prereq notes are parsed here once per course instead of on every lookup.
+        Indexes are swapped in at the end so a background refresh never exposes a partial build.
+        """
+        subject_names: Dict[str, str] = {}
+        # Built as insertion-ordered dicts so cross-listed duplicates are added once
+        subject_open: Dict[str, Dict[str, None]] = {}
+        subject_open_no_prereq: Dict[str, Dict[str, None]] = {}
+        core_open: Dict[str, Dict[str, None]] = {}
+        prereq_index: Dict[str, frozenset] = {}
+        subject_courses: Dict[str, List[Dict]] = {}
+        course_index: Dict[str, Dict] = {}
+
+        for course_data in sorted(self.data_cache, key=lambda c: str(c.get('courseNumber', ''))):
+            subj = str(course_data.get('subject', ''))
+            desc = str(course_data.get('subjectDescription', '')).upper()
+            if desc:
+                subject_names.setdefault(desc, subj)
+
+            # Cross-listed duplicates share a code, so their prereqs are merged
+            full_code = f"{subj}:{course_data.get('courseNumber', '')}"
+            prereq_index[full_code] = prereq_index.get(full_code, frozenset()) | self._extract_prereqs(course_data)
+            subject_courses.setdefault(subj, []).append(course_data)
+            course_index.setdefault(full_code, course_data) # First listing wins, as in catalog order
+
+            if not course_data.get('openSections'):
+                continue
+
+            subject_open.setdefault(subj, {})[full_code] = None
+            if not prereq_index[full_code]:
+                subject_open_no_prereq.setdefault(subj, {})[full_code] = None
+
+            for core in course_data.get('coreCodes') or []:
+                core_code = str(core.get('code', '')).upper()
+                if core_code:
+                    core_open.setdefault(core_code, {})[full_code] = None
+
+        self._subject_names = subject_names
+        self._subject_open = {k: list(v) for k, v in subject_open.items()}
+        self._subject_open_no_prereq = {k: list(v) for k, v in subject_open_no_prereq.items()}
+        self._core_open = {k: list(v) for k, v in core_open.items()}
+        self._prereq_index = prereq_index
+        self._subject_courses = subject_courses
+        self._course_index = course_index
+
+    def refresh(self) -> None:
+        """Re-fetches live seat data and rebuilds the indexes; keeps the current data on failure or no change."""
+        data = self.force_update(self._validators)
+        if data:
+            self.data_cache = data
+            self._build_indexes()
+
+    def get_open_course_codes(self, query: str, freshman_safe: bool = False) -> List[str]:
+        """
+        Resolves a subject code, subject name or core code to the codes of its
+        open courses. With freshman_safe, only courses without prereqs are returned.
+        """
+        query = query.upper().strip()
+        subj = self._subject_names.get(query, query)
+        if subj in self._subject_open:
+            index = self._subject_open_no_prereq if freshman_safe else self._subject_open
+            return index.get(subj, [])
+        return self._core_open.get(query, [])
+
     def _extract_prereqs(self, course_data: Dict) -> Set[str]:
         """
         Parses 'preReqNotes' and 'sectionNotes' to find course codes.
@@ -90,10 +219,14 @@ class JsonFileAdapter(ICourseRepository):
         
         raw_text = str(course_data.get('preReqNotes', '')) + " " + str(course_data.get('courseNotes', ''))
         
+        # Most courses carry no notes at all; every code needs a colon, so skip the regex
+        if ':' not in raw_text:
+            return prereqs
+
         # Regex to find course codes like "01:198:111" or "198:111"
         # We normalize to "198:111" (Short Code) for comparison
         # Pattern: Optional 2 digits + colon, then 3 digits, colon, 3 digits
-        matches = re.findall(r'(?:(\d{2}):)?(\d{3}):(\d{3})', raw_text)
+        matches = PREREQ_CODE_RE.findall(raw_text)
         
         for m in matches:
             # m is tuple: (school, subject, course)
@@ -105,49 +238,74 @@ class JsonFileAdapter(ICourseRepository):
 
     def get_courses(self, course_codes: List[str]) -> List[Course]:
         found_courses = []
-        target_codes = {code.strip().upper() for code in course_codes if code.strip()}
+        target_codes = dict.fromkeys(code.strip().upper() for code in course_codes if code.strip())
         
-        for course_data in self.data_cache:
-            subj = str(course_data.get('subject', ''))
-            num = str(course_data.get('courseNumber', ''))
-            full_code = f"{subj}:{num}"
-            
-            if full_code in target_codes:
-                title = course_data.get('title', 'Unknown Course')
-                sections_data = course_data.get('sections', [])
-                sections = [Section(s) for s in sections_data]
-                
-                # Extract Prereqs
-                prereqs = self._extract_prereqs(course_data)
-                
-                found_courses.append(Course(title, full_code, sections, prereqs))
-                
-                target_codes.remove(full_code)
-                if not target_codes:
-                    break
+        for full_code in target_codes:
+            course_data = self._course_index.get(full_code)
+            if course_data is None:
+                continue
+
+            title = course_data.get('title', 'Unknown Course')
+            sections = [Section(s) for s in course_data.get('sections', [])]
+            found_courses.append(Course(title, full_code, sections, self._prereq_index.get(full_code)))
         
         return found_courses
 
     def search_courses(self, query: str) -> List[Course]:
         query = query.upper().strip()
+        subj = self._subject_names.get(query, query)
+
+        # Subject codes and names resolve through the index; anything else is a title search
+        if subj in self._subject_courses:
+            candidates = self._subject_courses[subj]
+        else:
+            candidates = (c for c in self.data_cache if query in str(c.get('title', '')).upper())
+
         matches = []
-        
-        for course_data in self.data_cache:
-            subj = str(course_data.get('subject', ''))
-            title = str(course_data.get('title', '')).upper()
+        for course_data in candidates:
+            full_code = f"{course_data.get('subject', '')}:{str(course_data.get('courseNumber', ''))}"
+            sections = [Section(s) for s in course_data.get('sections', [])]
+            prereqs = self._prereq_index.get(full_code)
+            matches.append(Course(course_data.get('title'), full_code, sections, prereqs))
             
-            if query == subj or query in title:
-                full_code = f"{subj}:{str(course_data.get('courseNumber', ''))}"
-                sections = [Section(s) for s in course_data.get('sections', [])]
-                prereqs = self._extract_prereqs(course_data)
-                matches.append(Course(course_data.get('title'), full_code, sections, prereqs))
-                
-                if len(matches) >= 20:
-                    break
+            if len(matches) >= 20:
+                break
         
         return matches
 
 class DataServiceFactory:
-    @staticmethod
-    def get_repository() -> ICourseRepository:
-        return JsonFileAdapter()
\ No newline at end of file
+    """
+    Holds one shared repository per process. warm_up() builds it on a daemon
+    thread at startup; get_repository() builds it inline if that hasn't finished.
+    """
+    _repository: ICourseRepository = None
+    _ready = threading.Event()
+    _lock = threading.Lock()
+
+    @classmethod
+    def warm_up(cls) -> None:
+        threading.Thread(target=cls._build_repository, daemon=True).start()
+        if Config.DATA_REFRESH_MINUTES > 0:
+            threading.Thread(target=cls._refresh_loop, daemon=True).start()
+
+    @classmethod
+    def _build_repository(cls) -> None:
+        with cls._lock:
+            if cls._repository is None:
+                cls._repository = JsonFileAdapter()
+                cls._ready.set()
+
+    @classmethod
+    def _refresh_loop(cls) -> None:
+        while True:
+            time.sleep(Config.DATA_REFRESH_MINUTES * 60)
+            try:
+                cls.get_repository().refresh()
+            except Exception as e:
+                logger.error(f"Background data refresh failed: {e}")
+
+    @classmethod
+    def get_repository(cls) -> ICourseRepository:
+        if not cls._ready.is_set():
+            cls._build_repository()
+        return cls._repository
\ No newline at end of file
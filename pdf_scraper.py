@@ -1,14 +1,38 @@
+import io
 import json
 import re
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
-# Try to import pypdf
 try:
-    from pypdf import PdfReader
+    import orjson
 except ImportError:
-    print("Error: pypdf not installed. Please run: pip install pypdf")
-    sys.exit(1)
+    orjson = None
+
+# Deletes list bullets from summary-page lines in one pass
+_BULLET_TABLE = str.maketrans('', '', '•')
+# Summary-list page footers like "14 / 520"
+_PAGE_NUM_RE = re.compile(r'^\d+\s*/\s*\d+$')
+# Program name followed by the asterisks that mark its school
+_NAME_STARS_RE = re.compile(r'([^*]+)(\*+)$')
+# Words that close a program's requirements header
+_HEADER_KEYWORD_RE = re.compile(r'Requirements|Curriculum', re.IGNORECASE)
+# School for each asterisk count after a program name (none means SAS)
+_SCHOOLS = ("SAS", "SEBS", "MGSA", "SMLR", "EJB", "GSE", "SCI", "RBS", "SAS/SCI")
+# Course codes like "198:111"
+_COURSE_CODE_RE = re.compile(r'\b(\d{3}:\d{3})\b')
+
+def _open_reader(pdf_path):
+    """Reads the whole PDF into memory first; pypdf seeks constantly and is much slower on a file stream."""
+    from pypdf import PdfReader
+    with open(pdf_path, 'rb') as f:
+        return PdfReader(io.BytesIO(f.read()))
+
+def _extract_page_texts(pdf_path, start, end):
+    """Extracts the text of pages [start, end) with its own reader; runs in a worker process."""
+    reader = _open_reader(pdf_path)
+    return [page.extract_text() for page in reader.pages[start:end]]
 
 def scrape_catalog_pdf(pdf_filename):
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -19,17 +43,38 @@ def scrape_catalog_pdf(pdf_filename):
         print(f"❌ Error: PDF not found at: {pdf_path}")
         return
 
+    # Checked here so a missing PDF fails fast without loading pypdf; readers import it lazily
+    try:
+        import pypdf
+    except ImportError:
+        print("Error: pypdf not installed. Please run: pip install pypdf")
+        sys.exit(1)
+
     print(f"✅ Reading {pdf_filename}...")
     try:
-        reader = PdfReader(pdf_path)
-        full_text = ""
+        reader = _open_reader(pdf_path)
+        page_texts = []
         
         # --- PHASE 1: FULL TEXT EXTRACTION ---
         # We need the full text for requirements searching later
-        print(f"  Document has {len(reader.pages)} pages. Scanning all...")
-        for i, page in enumerate(reader.pages):
-            full_text += page.extract_text() + "\n"
-            if i % 200 == 0: print(f"    Processed {i} pages...")
+        page_count = len(reader.pages)
+        workers = min(os.cpu_count() or 1, page_count)
+        print(f"  Document has {page_count} pages. Scanning all with {workers} worker(s)...")
+        if workers > 1:
+            # Text extraction is pure-Python CPU work, so pages are split into one contiguous range per process
+            step = -(-page_count // workers)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_extract_page_texts, pdf_path, start, min(start + step, page_count))
+                           for start in range(0, page_count, step)]
+                for future in futures:
+                    page_texts.extend(future.result())
+                    print(f"    Processed {len(page_texts)} pages...")
+        else:
+            for i, page in enumerate(reader.pages):
+                page_texts.append(page.extract_text())
+                if i % 200 == 0: print(f"    Processed {i} pages...")
+        # Joined once at the end; repeated += recopied the growing text on every page
+        full_text = "\n".join(page_texts)
 
         catalog_db = {
             "majors": {},
@@ -45,79 +90,79 @@ def scrape_catalog_pdf(pdf_filename):
         
         print("  Parsing Summary Lists from specific page ranges...")
 
-        def parse_pages(start_page, end_page, category_key):
-            # pypdf is 0-indexed, so Page 14 is index 13
-            start_idx = start_page - 1
-            end_idx = end_page # slice is exclusive
-            
-            chunk_text = ""
-            for i in range(start_idx, end_idx):
-                if i < len(reader.pages):
-                    chunk_text += reader.pages[i].extract_text() + "\n"
-            
-            lines = chunk_text.split('\n')
-            count = 0
-            
-            school_map = {
-                "": "SAS", "*": "SEBS", "**": "MGSA", "***": "SMLR", 
-                "****": "EJB", "*****": "GSE", "******": "SCI", 
-                "*******": "RBS", "********": "SAS/SCI"
-            }
-
-            for line in lines:
-                line = line.strip()
+        # Pages are given 1-based and inclusive, as printed; neighbouring ranges share their boundary page
+        summary_ranges = [(14, 17, "majors"), (17, 20, "minors"), (20, 24, "certificates")]
+        counts = {category_key: 0 for _, _, category_key in summary_ranges}
+
+        # One pass over the summary pages; each page's lines go to every category whose range covers it.
+        # Reuses the Phase 1 text; extract_text is by far the slowest pypdf call
+        for i in range(13, min(24, len(page_texts))): # pypdf is 0-indexed, so Page 14 is index 13
+            categories = [key for start_page, end_page, key in summary_ranges if start_page - 1 <= i < end_page]
+
+            for line in page_texts[i].split('\n'):
                 # Remove bullets
-                clean_line = line.replace('•', '').strip()
+                clean_line = line.translate(_BULLET_TABLE).strip()
                 
                 # Filters
                 if len(clean_line) < 4: continue
                 if "Rutgers University" in clean_line: continue
                 if "Programs of Study" in clean_line: continue
-                if re.match(r'^\d+\s*/\s*\d+$', clean_line): continue # Page nums
+                if _PAGE_NUM_RE.match(clean_line): continue # Page nums
                 
                 # Parse Name and School (Asterisks)
                 # Look for asterisks at the end
-                match = re.search(r'([^*]+)(\*+)$', clean_line)
+                match = _NAME_STARS_RE.search(clean_line)
                 if match:
                     name = match.group(1).strip()
-                    stars = match.group(2)
-                    school = school_map.get(stars, "Unknown")
+                    stars = len(match.group(2))
+                    school = _SCHOOLS[stars] if stars < len(_SCHOOLS) else "Unknown"
                 else:
                     name = clean_line
                     school = "SAS" # Default
                 
                 # Store
-                if name not in catalog_db[category_key]:
-                    catalog_db[category_key][name] = {"school": school, "requirements": []}
-                    count += 1
-            
-            print(f"    Pages {start_page}-{end_page}: Found {count} {category_key}.")
+                for category_key in categories:
+                    if name not in catalog_db[category_key]:
+                        catalog_db[category_key][name] = {"school": school, "requirements": []}
+                        counts[category_key] += 1
 
-        # Run Parsers
-        parse_pages(14, 17, "majors")
-        parse_pages(17, 20, "minors")
-        parse_pages(20, 24, "certificates")
+        for start_page, end_page, category_key in summary_ranges:
+            print(f"    Pages {start_page}-{end_page}: Found {counts[category_key]} {category_key}.")
 
         print(f"  Total Discovered: {len(catalog_db['majors'])} Majors, {len(catalog_db['minors'])} Minors, {len(catalog_db['certificates'])} Certificates.")
 
         # --- PHASE 3: REQUIREMENTS EXTRACTION ---
         print("  Extracting requirements (course codes)...")
         
-        # Helper to find reqs in the full text body
+        # Heuristic: a program's header is its name followed, on the same line, by "Requirements" or "Curriculum".
+        # We skip the TOC area (first 100k chars) to avoid finding the list itself; searching from an offset avoids copying the body
+        body_start = 100000
+
+        def find_headers(names):
+            # One pass over the body: at each keyword, every still-unmatched name that appears earlier
+            # on that line has its first header there, just as a per-name "name.*?keyword" search would find
+            pending = {name: name.lower() for name in names}
+            offsets = {}
+            for keyword in _HEADER_KEYWORD_RE.finditer(full_text, body_start):
+                if not pending: break
+                line_start = max(full_text.rfind('\n', body_start, keyword.start()) + 1, body_start)
+                before = full_text[line_start:keyword.start()].lower()
+                for name, lower_name in list(pending.items()):
+                    if lower_name in before:
+                        offsets[name] = keyword.end()
+                        del pending[name]
+            return offsets
+
+        all_names = [name for cat in ["majors", "minors", "certificates"] for name in catalog_db[cat]]
+        header_offsets = find_headers(all_names)
+
         def extract_reqs(name):
-            # Heuristic: Find "Name" header followed by "Requirements" within 5000 chars
-            # We skip the TOC area (first 100k chars) to avoid finding the list itself
-            body_text = full_text[100000:]
-            
-            header_regex = re.compile(rf"{re.escape(name)}.*?(?:Requirements|Curriculum)", re.IGNORECASE)
-            match = header_regex.search(body_text)
-            
-            if match:
-                start = match.end()
-                chunk = body_text[start:start+4000]
+            start = header_offsets.get(name)
+            if start is not None:
+                chunk = full_text[start:start+4000]
                 # Find codes 000:000
-                codes = re.findall(r'\b(\d{3}:\d{3})\b', chunk)
-                return list(set(codes))[:25]
+                codes = _COURSE_CODE_RE.findall(chunk)
+                return list(dict.fromkeys(codes))[:25] # First-seen order keeps the output stable across runs
             return []
 
         # Update DB with requirements
@@ -128,8 +173,15 @@ def scrape_catalog_pdf(pdf_filename):
                     catalog_db[cat][name]["requirements"] = reqs
 
         # Save
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(catalog_db, f, indent=2)
+        # Written whole to a temp file and renamed over the old one, so a crash never leaves a truncated catalog
+        if orjson:
+            payload = orjson.dumps(catalog_db, option=orjson.OPT_INDENT_2)
+        else:
+            payload = json.dumps(catalog_db, indent=2).encode('utf-8')
+        tmp_path = output_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp_path, output_path)
         print(f"✅ Saved catalog database to: {output_path}")
 
     except Exception as e:
@@ -1,6 +1,12 @@
 import re
+from bisect import bisect_right
 from typing import List, Dict
 
+_WHITESPACE_RE = re.compile(r'\s+')
+_CODE_RE = re.compile(r'(\d{2}):(\d{3}):(\d{3})')
+_TERM_RE = re.compile(r'(Fall|Spring|Summer|Winter|Placement)(\s*\d{4})?', re.IGNORECASE)
+_CREDITS_GRADE_RE = re.compile(r'\s*(\d\.?5?)\s*([A-Za-z\+\s,]+)')
+
 class PrerequisiteParser:
     @staticmethod
     def parse_copy_paste(raw_text: str) -> List[Dict]:
@@ -8,13 +14,16 @@ class PrerequisiteParser:
         Extracts course details from raw text.
         """
         parsed_courses = []
-        clean_text = re.sub(r'\s+', ' ', raw_text)
+        clean_text = _WHITESPACE_RE.sub(' ', raw_text)
         
-        code_pattern = re.compile(r'(\d{2}):(\d{3}):(\d{3})')
-        matches = list(code_pattern.finditer(clean_text))
+        matches = list(_CODE_RE.finditer(clean_text))
         
         seen_codes = set()
         
+        # Scan term headers once; each code belongs to the nearest header before it
+        term_matches = list(_TERM_RE.finditer(clean_text))
+        term_ends = [m.end() for m in term_matches]
+        
         for match in matches:
             full_code = match.group(0)
             if full_code in seen_codes: continue
@@ -24,11 +33,10 @@ class PrerequisiteParser:
             end_idx = match.end()
             
             # Look behind for Term
-            lookbehind = clean_text[max(0, start_idx-30):start_idx]
             term = "Unknown"
-            term_match = re.search(r'(Fall|Spring|Summer|Winter|Placement)(\s*\d{4})?', lookbehind, re.IGNORECASE)
-            if term_match:
-                term = term_match.group(0).strip()
+            term_pos = bisect_right(term_ends, start_idx) - 1
+            if term_pos >= 0:
+                term = term_matches[term_pos].group(0).strip()
             
             # Look ahead for Credits/Grade
             lookahead = clean_text[end_idx:end_idx+30]
@@ -36,7 +44,7 @@ class PrerequisiteParser:
             grade = "?"
             
             # Pattern: Digit + Text
-            cg_match = re.match(r'\s*(\d\.?5?)\s*([A-Za-z\+\s,]+)', lookahead)
+            cg_match = _CREDITS_GRADE_RE.match(lookahead)
             if cg_match:
                 credits = cg_match.group(1)
                 grade_raw = cg_match.group(2).strip()
@@ -61,8 +69,6 @@ class PrerequisiteParser:
 
     @staticmethod
     def filter_completed_courses(recommended: List[str], history: List[Dict]) -> List[str]:
-        taken = set()
-        for h in history:
-            taken.add(h['short_code'])
-            taken.add(h['code'])
+        taken = {h['short_code'] for h in history}
+        taken.update(h['code'] for h in history)
         return [c for c in recommended if c not in taken]
\ No newline at end of file
@@ -1,8 +1,37 @@
+import re
 from abc import ABC, abstractmethod
+from functools import lru_cache
 from typing import List, Dict, Optional, Set
 
 # --- Domain Models ---
 
+# One bit per SIS meeting day; unknown days share a catch-all bit so they still get compared
+DAY_BITS = {'M': 1, 'T': 2, 'W': 4, 'H': 8, 'F': 16, 'S': 32, 'U': 64}
+UNKNOWN_DAY_BIT = 128
+
+# SIS meetingDay code for each full day name (Thursday is 'H')
+DAY_NAMES = {'MONDAY': 'M', 'TUESDAY': 'T', 'WEDNESDAY': 'W', 'THURSDAY': 'H', 'FRIDAY': 'F', 'SATURDAY': 'S', 'SUNDAY': 'U'}
+
+# Every spelling we accept: the SIS codes, 'R' for Thursday, and every 2+ letter prefix of a full name
+DAY_CODES = {code: code for code in DAY_NAMES.values()}
+DAY_CODES['R'] = 'H'
+DAY_CODES.update({name[:k]: code for name, code in DAY_NAMES.items() for k in range(2, len(name) + 1)})
+
+# The only campus tokens the travel rules distinguish; any other campus is compared by name
+CAMPUS_RE = re.compile(r'ONLINE|BUSCH|LIV')
+
+@lru_cache(maxsize=64)
+def campus_key(campus: str) -> str:
+    """Collapses an uppercase campus name to 'ONLINE', 'BUSCH' or 'LIV' in one scan, else returns it unchanged. Memoized: SIS has a handful of campuses."""
+    match = CAMPUS_RE.search(campus)
+    return match.group(0) if match else campus
+
+@lru_cache(maxsize=64)
+def normalize_day(day: str) -> str:
+    """Maps any accepted day spelling to its SIS code; unknown input is just uppercased."""
+    day = day.strip().upper()
+    return DAY_CODES.get(day, day)
+
 class TimeSlot:
     """Represents a specific meeting time."""
     def __init__(self, day: str, start_time: int, end_time: int, raw_time_str: str = "", campus: str = ""):
@@ -11,6 +40,8 @@ class TimeSlot:
         self.end_time = end_time     # Minutes from midnight
         self.raw_time_str = raw_time_str
         self.campus = campus
+        self.campus_key = campus_key(campus.upper())
+        self.day_mask = DAY_BITS.get(day, UNKNOWN_DAY_BIT)
 
     def overlaps(self, other: 'TimeSlot') -> bool:
         if self.day != other.day:
@@ -29,49 +60,63 @@ class Section:
         self.raw_times = section_data.get('meetingTimes', [])
         # Extract campus from meeting times (usually consistent for a section)
         self.time_slots: List[TimeSlot] = self._parse_times(self.raw_times)
+        self.day_mask = 0
+        for slot in self.time_slots:
+            self.day_mask |= slot.day_mask
         self.open_status = section_data.get('openStatus', False)
 
     def _parse_times(self, meeting_times: List[Dict]) -> List[TimeSlot]:
         """Parses raw Rutgers time data into comparable TimeSlot objects."""
         slots = []
+        # Meetings of a section nearly always share a campus, so its name is normalized once
+        raw_campus = campus = None
         for mt in meeting_times:
             if mt.get('meetingDay') is None:
                 continue
             
             start_str = mt.get('startTime')
             end_str = mt.get('endTime')
-            # Extract Campus Name (e.g. "LIVINGSTON", "BUSCH")
-            campus = mt.get('campusName', mt.get('campusLocation', 'Unknown')).upper()
-            
+            # By-arrangement/online meetings have no times; skip them before any further parsing
             if not start_str or not end_str:
                 continue
 
+            # Extract Campus Name (e.g. "LIVINGSTON", "BUSCH")
+            name = mt.get('campusName') if 'campusName' in mt else mt.get('campusLocation', 'Unknown')
+            if name != raw_campus:
+                raw_campus, campus = name, name.upper()
+            pm_code = mt.get('pmCode')
+
             slots.append(TimeSlot(
                 day=mt['meetingDay'],
-                start_time=self._convert_to_minutes(start_str, mt.get('pmCode')),
-                end_time=self._convert_to_minutes(end_str, mt.get('pmCode')), 
+                start_time=self._convert_to_minutes(start_str, pm_code),
+                end_time=self._convert_to_minutes(end_str, pm_code), 
                 raw_time_str=f"{start_str}-{end_str}",
                 campus=campus
             ))
         return slots
 
-    def _convert_to_minutes(self, time_str: str, pm_code: str = None) -> int:
-        """Helper to convert '1230' or '10:30' to minutes from midnight."""
-        try:
-            time_str = time_str.replace(":", "")
-            hours = int(time_str[:2])
-            minutes = int(time_str[2:])
-            
-            if pm_code == 'P' and hours != 12:
-                hours += 12
-            elif pm_code == 'A' and hours == 12:
-                hours = 0
-                
-            return hours * 60 + minutes
-        except:
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _convert_to_minutes(time_str: str, pm_code: str = None) -> int:
+        """Helper to convert '1230' or '10:30' to minutes from midnight. Memoized: SIS uses under a hundred distinct times."""
+        time_str = time_str.replace(":", "")
+        # Malformed times (too short, non-numeric) count as midnight, as before
+        if len(time_str) < 3 or not time_str.isdigit():
             return 0
+        hours = int(time_str[:2])
+        minutes = int(time_str[2:])
+        
+        if pm_code == 'P' and hours != 12:
+            hours += 12
+        elif pm_code == 'A' and hours == 12:
+            hours = 0
+            
+        return hours * 60 + minutes
 
     def overlaps(self, other: 'Section') -> bool:
+        # Sections meeting on disjoint days can never collide
+        if not self.day_mask & other.day_mask:
+            return False
         for my_slot in self.time_slots:
             for other_slot in other.time_slots:
                 if my_slot.overlaps(other_slot):
@@ -84,6 +129,7 @@ class Course:
         self.title = title
         self.code = code
         self.sections = sections
+        self.open_sections = [s for s in sections if s.open_status] # Only these can be scheduled
         self.prereqs = prereqs or set() # Set of codes like "01:640:111"
 
     def __repr__(self):
@@ -92,7 +138,7 @@ class Course:
 class ScheduleConstraints:
     """Holds user-defined constraints for the schedule."""
     def __init__(self, no_days: List[str] = None):
-        self.no_days = [d.upper() for d in (no_days or [])] 
+        self.no_days = [normalize_day(d) for d in (no_days or [])] 
 
 # --- Interfaces (Strategy Pattern) ---
 
@@ -110,4 +156,8 @@ class ICourseRepository(ABC):
     
     @abstractmethod
     def search_courses(self, query: str) -> List[Course]:
+        pass
+
+    @abstractmethod
+    def get_open_course_codes(self, query: str, freshman_safe: bool = False) -> List[str]:
         pass
\ No newline at end of file
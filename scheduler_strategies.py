@@ -8,9 +8,20 @@ class DeepSeekSchedulerStrategy(ISchedulingStrategy):
     
     STANDARD_TRAVEL_MINUTES = 40
     SHORT_TRAVEL_MINUTES = 30 # Busch <-> Livi
+    SHORT_TRAVEL_PAIRS = {("BUSCH", "LIV"), ("LIV", "BUSCH")}
 
     def generate_schedules(self, courses: List[Course], constraints: ScheduleConstraints = None) -> List[List[Section]]:
         valid_schedules = []
+        # A course with no open seats makes every combination impossible
+        if any(not c.open_sections for c in courses): return valid_schedules
+
+        # --- PREREQUISITE CHECK (Same Semester Conflict) ---
+        # A course and its prereq can't be taken in the SAME semester. This doesn't depend on
+        # sections, so one set intersection per course replaces the per-node pairwise scan.
+        # We do NOT check against history here (that is done in app.py filtering).
+        requested_codes = {c.code for c in courses}
+        if any(c.prereqs & (requested_codes - {c.code}) for c in courses): return valid_schedules
+
         # Sort courses to try to place harder-to-schedule ones first (fewer sections)
         sorted_courses = sorted(courses, key=lambda c: len(c.sections))
         
@@ -22,22 +33,7 @@ class DeepSeekSchedulerStrategy(ISchedulingStrategy):
 
             current_course = sorted_courses[course_idx]
 
-            # --- PREREQUISITE CHECK (Same Semester Conflict) ---
-            # We only check if we are trying to schedule a course AND its prereq in the SAME semester.
-            # We do NOT check against history here (that is done in app.py filtering).
-            for i, scheduled_section in enumerate(current_schedule):
-                scheduled_course = sorted_courses[i]
-                
-                # Conflict: Scheduled course is a prereq for Current
-                if scheduled_course.code in current_course.prereqs:
-                    return 
-                # Conflict: Current course is a prereq for Scheduled (rare but possible order)
-                if current_course.code in scheduled_course.prereqs:
-                    return
-
-            for section in current_course.sections:
-                if not section.open_status: continue 
-                
+            for section in current_course.open_sections:
                 # Overlap & Travel Checks
                 if self._has_issue(section, current_schedule): continue
 
@@ -64,6 +60,8 @@ class DeepSeekSchedulerStrategy(ISchedulingStrategy):
     
     def _check_travel(self, sec1: Section, sec2: Section) -> bool:
         """Returns True if travel is feasible (or days differ)."""
+        if not sec1.day_mask & sec2.day_mask: return True
+
         for slot1 in sec1.time_slots:
             for slot2 in sec2.time_slots:
                 if slot1.day != slot2.day: continue
@@ -72,15 +70,16 @@ class DeepSeekSchedulerStrategy(ISchedulingStrategy):
                 first, second = (slot1, slot2) if slot1.end_time < slot2.start_time else (slot2, slot1)
                 gap = second.start_time - first.end_time
                 
-                c1 = slot1.campus.upper()
-                c2 = slot2.campus.upper()
+                # Campus keys are classified once per slot when sections are built
+                c1 = slot1.campus_key
+                c2 = slot2.campus_key
                 
                 # Ignore Online/Same Campus
-                if c1 == c2 or "ONLINE" in c1 or "ONLINE" in c2:
+                if c1 == c2 or c1 == "ONLINE" or c2 == "ONLINE":
                     continue
 
                 # Different Campuses
-                is_pair_BL = ("BUSCH" in c1 and "LIV" in c2) or ("LIV" in c1 and "BUSCH" in c2)
+                is_pair_BL = (c1, c2) in self.SHORT_TRAVEL_PAIRS
                 required_time = self.SHORT_TRAVEL_MINUTES if is_pair_BL else self.STANDARD_TRAVEL_MINUTES
                 
                 if gap < required_time:
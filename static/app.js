@@ -143,6 +143,10 @@ document.addEventListener('DOMContentLoaded', () => {
                 displaySchedules(data.schedules);
             }
 
+            if (data.advice_id) {
+                fetchAdvice(data.advice_id);
+            }
+
         } catch (error) {
             removeMessage(loadingId);
             addMessage("Server Error.", 'bot-message error');
@@ -150,6 +154,19 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // Advisor notes arrive after the schedules so they never delay rendering
+    async function fetchAdvice(adviceId) {
+        try {
+            const response = await fetch(`/api/advice/${adviceId}`);
+            const data = await response.json();
+            if (data.message) {
+                addMessage(data.message, 'bot-message');
+            }
+        } catch (error) {
+            console.error('Advice Error:', error);
+        }
+    }
+
     function addMessage(text, className, isLoading = false) {
         const div = document.createElement('div');
         div.className = `message ${className}`;